@@ -3,11 +3,14 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 import json
+import math
 from src.data_loader import DataLoader
 from src.portfolio import Portfolio
 from src.strategies import TrendFollowingStrategy
 from src.mean_reversion import MeanReversionStrategy
 from src.scanner import MarketScanner
+from src.checkpoint import CheckpointStore
+from src.history import SimulationHistory
 
 app = FastAPI()
 
@@ -38,10 +41,14 @@ universe = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'NVDA', 'META', 'AMD', 'NFL
 # yfinance limitation: 1h data is available for last 730 days, but let's use 60d to be safe and fast
 data_loader = DataLoader(universe, interval='1h', period='60d')
 scanner = MarketScanner(universe, strategy)
+checkpoint_store = CheckpointStore(directory='checkpoints')
+history = SimulationHistory(capacity=2000)
 
 connected_clients = []
 simulation_task = None
 is_running = False
+checkpoint_name = "latest" # Where the current run writes its checkpoints
+checkpoint_every = 50 # Bars between periodic checkpoints (0 disables)
 
 class StrategyRequest(BaseModel):
     name: str
@@ -49,28 +56,96 @@ class StrategyRequest(BaseModel):
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    # Late joiners get a downsampled view of the run so far before live ticks.
+    # Build the frame and register the client with no await in between, so every
+    # bar is either in the frame or delivered by a later broadcast.
+    initial_frame = build_history(max_points=500, trades_limit=50)
     connected_clients.append(websocket)
     try:
+        await websocket.send_json(initial_frame)
         while True:
             await websocket.receive_text() # Keep connection open
     except:
         connected_clients.remove(websocket)
 
 async def broadcast(message):
-    for client in connected_clients:
+    # Iterate over a copy: clients that connect mid-broadcast already have this bar in their history frame
+    for client in list(connected_clients):
         try:
             await client.send_json(message)
         except:
             pass
 
-async def run_simulation_loop():
+def simulation_active():
+    # The task still owns the global state until its final checkpoint is written
+    return is_running or checkpoint_store.busy or (simulation_task is not None and not simulation_task.done())
+
+def coerce_param(key, current, value):
+    """
+    Converts an override to the type of the existing strategy parameter.
+    All tunable parameters (windows, multipliers, std devs) must be positive.
+    """
+    # Only plain numeric parameters can be overridden, not per-ticker state
+    if isinstance(current, bool) or not isinstance(current, (int, float)):
+        raise ValueError(f"Unknown strategy parameter: {key}")
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid value for {key}: {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid value for {key}: {value!r}")
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{key} must be a positive number")
+    if isinstance(current, int):
+        if not number.is_integer():
+            raise ValueError(f"{key} must be an integer")
+        return int(number)
+    return number
+
+def take_checkpoint(timestamp, bar_index):
+    return checkpoint_store.capture(portfolio, strategy, active_strategy_name, timestamp, bar_index, history)
+
+def serialize_trade(trade):
+    return {**trade, 'timestamp': str(trade['timestamp'])}
+
+def build_history(max_points=500, tickers=None, trades_offset=None, trades_limit=100):
+    """
+    Downsampled equity/price history plus one page of trades.
+    With no trades_offset, the most recent page is returned.
+    """
+    trade_history = portfolio.trade_history
+    total_trades = len(trade_history)
+    if trades_offset is None:
+        trades_offset = max(total_trades - trades_limit, 0)
+    trades = trade_history[trades_offset:trades_offset + trades_limit]
+    return {
+        'type': 'history',
+        'is_running': is_running,
+        'initial_cash': portfolio.initial_cash,
+        'cash': portfolio.cash,
+        'positions': dict(portfolio.positions),
+        **history.to_dict(max_points=max_points, tickers=tickers),
+        'trades': [serialize_trade(t) for t in trades],
+        'trades_offset': trades_offset,
+        'trades_total': total_trades
+    }
+
+async def save_final_checkpoint(name, snapshot):
+    # Wait for any periodic write first; the store keeps a single write in flight
+    await checkpoint_store.flush()
+    checkpoint_store.save_in_background(name, snapshot)
+    await checkpoint_store.flush()
+
+async def run_simulation_loop(start_after=None, bar_index=0):
     """
     Runs the simulation step-by-step and broadcasts updates.
+    Resumes after `start_after` when restarting from a checkpoint.
     """
     global is_running
     print("Starting simulation loop...")
     is_running = True
-    candle_stream = data_loader.get_latest_candles()
+    candle_stream = data_loader.get_latest_candles(start_after=start_after)
+    last_timestamp = start_after
     
     try:
         for timestamp, snapshot in candle_stream:
@@ -98,7 +173,11 @@ async def run_simulation_loop():
                             'timestamp': str(timestamp)
                         })
             
-            # 3. Broadcast Update
+            # 3. Record downsampled history for late-joining clients
+            prices = {t: c['Close'] for t, c in snapshot.items()}
+            history.record(bar_index, timestamp, portfolio.equity_curve[-1], prices)
+            
+            # 4. Broadcast Update
             update = {
                 'type': 'update',
                 'timestamp': str(timestamp),
@@ -106,10 +185,16 @@ async def run_simulation_loop():
                 'cash': portfolio.cash,
                 'positions': portfolio.positions,
                 'trades': trades,
-                'prices': {t: c['Close'] for t, c in snapshot.items()}
+                'prices': prices
             }
             await broadcast(update)
             
+            # 5. Periodic checkpoint (write happens off the event loop)
+            bar_index += 1
+            last_timestamp = timestamp
+            if checkpoint_every and bar_index % checkpoint_every == 0 and not checkpoint_store.busy:
+                checkpoint_store.save_in_background(checkpoint_name, take_checkpoint(timestamp, bar_index))
+            
             # Simulate delay for visual effect
             await asyncio.sleep(0.1) 
             
@@ -118,25 +203,55 @@ async def run_simulation_loop():
     except asyncio.CancelledError:
         print("Simulation cancelled.")
     finally:
+        # The run is now only finalizing: /api/stop has nothing left to cancel, while
+        # simulation_active() still blocks new runs until the final write is done.
         is_running = False
+        # Always leave a checkpoint at the last processed bar so the run can be resumed.
+        # Capture it before any await so it can only ever contain this run's state.
+        if last_timestamp is not None:
+            final_snapshot = take_checkpoint(last_timestamp, bar_index)
+            await asyncio.shield(save_final_checkpoint(checkpoint_name, final_snapshot))
 
 class StartSimulationRequest(BaseModel):
     initial_cash: float = 100000.0
     enable_broker_charges: bool = False
+    checkpoint_name: str = "latest"
+    checkpoint_every: int = 50
+
+class ResumeRequest(BaseModel):
+    name: str = "latest"
+    # Optional fork: write checkpoints under a new name and override strategy parameters
+    save_as: str = None
+    params: dict = {}
 
 @app.post("/api/start")
 async def start_simulation(req: StartSimulationRequest):
-    global simulation_task, is_running, portfolio
-    if is_running:
+    global simulation_task, is_running, portfolio, history, strategy, checkpoint_name, checkpoint_every
+    if simulation_active():
         return {"status": "already_running"}
     
+    # Validate before touching any state so a bad request keeps the previous run intact
+    try:
+        checkpoint_store.path_for(req.checkpoint_name)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if req.checkpoint_every < 0:
+        return {"status": "error", "message": "checkpoint_every must be >= 0"}
+    
     # Re-initialize portfolio with user settings
     commission_rate = 0.001 if req.enable_broker_charges else 0.0
     portfolio = Portfolio(initial_cash=req.initial_cash, commission_rate=commission_rate)
+    history = SimulationHistory(capacity=2000)
     
-    # Reset strategy state
+    # Reset strategy state. A resumed run may have left a restored (possibly forked)
+    # instance active, so go back to the registered one with its own parameters.
+    strategy = strategies[active_strategy_name]
     strategy.reset()
     
+    checkpoint_name = req.checkpoint_name
+    checkpoint_every = req.checkpoint_every
+    checkpoint_store.reset(checkpoint_name)
+    
     simulation_task = asyncio.create_task(run_simulation_loop())
     return {"status": "started", "config": req.dict()}
 
@@ -155,6 +270,76 @@ async def stop_simulation():
             pass
     return {"status": "stopped"}
 
+@app.post("/api/resume")
+async def resume_simulation(req: ResumeRequest):
+    global simulation_task, portfolio, history, strategy, active_strategy_name, checkpoint_name
+    if simulation_active():
+        return {"status": "already_running"}
+    
+    try:
+        target_name = req.save_as or req.name
+        checkpoint_store.path_for(target_name)
+        state = await checkpoint_store.load_async(req.name)
+    except FileNotFoundError:
+        return {"status": "error", "message": "Checkpoint not found"}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    # Another run may have started while the checkpoint was loading
+    if simulation_active():
+        return {"status": "already_running"}
+    
+    restored = state['strategy']
+    try:
+        overrides = {
+            key: coerce_param(key, getattr(restored, key, None), value)
+            for key, value in req.params.items()
+        }
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    for key, value in overrides.items():
+        setattr(restored, key, value)
+    
+    portfolio = state['portfolio']
+    history = state.get('history') or SimulationHistory(capacity=2000)
+    # The restored instance only lives for this run; the registry keeps its defaults
+    active_strategy_name = state['strategy_name']
+    strategy = restored
+    checkpoint_name = target_name
+    if checkpoint_name == req.name:
+        checkpoint_store.adopt(checkpoint_name, state)
+    else:
+        # A fork starts its own file with the full restored state
+        checkpoint_store.reset(checkpoint_name)
+    
+    simulation_task = asyncio.create_task(
+        run_simulation_loop(start_after=state['timestamp'], bar_index=state['bar_index'])
+    )
+    return {
+        "status": "resumed",
+        "checkpoint": req.name,
+        "save_as": checkpoint_name,
+        "timestamp": str(state['timestamp']),
+        "bar_index": state['bar_index']
+    }
+
+@app.get("/api/checkpoints")
+def list_checkpoints():
+    return {"checkpoints": checkpoint_store.list()}
+
+@app.get("/api/history")
+def get_history(points: int = 500, tickers: str = None, trades_offset: int = None, trades_limit: int = 100):
+    """
+    Equity curve and price series downsampled to at most `points` points,
+    plus a page of trade history. `tickers` is a comma-separated filter.
+    """
+    ticker_list = tickers.split(',') if tickers else None
+    return build_history(
+        max_points=max(points, 2),
+        tickers=ticker_list,
+        trades_offset=max(trades_offset, 0) if trades_offset is not None else None,
+        trades_limit=max(trades_limit, 0)
+    )
+
 @app.post("/api/strategy")
 async def set_strategy(req: StrategyRequest):
     global strategy, active_strategy_name
@@ -0,0 +1,268 @@
+import asyncio
+import copy
+import os
+import pickle
+import re
+import struct
+import time
+import zlib
+import pandas as pd
+
+CHECKPOINT_VERSION = 2
+VALID_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+RECORD_HEADER = struct.Struct('<Q') # Byte length of each compressed record
+COMPACT_EVERY = 100 # Records appended before the log is rewritten as one full record
+
+class CheckpointStore:
+    """
+    Saves and restores simulation state (portfolio, strategy, stream position)
+    so a run can be paused, resumed or forked.
+
+    A checkpoint file is a sequence of compressed pickle records. The first
+    record of a run holds the full state; later records hold only the small
+    mutable state (cash, positions, stops) plus the rows appended since the
+    previous record to the equity curve, trade history and strategy price
+    history, so each write costs O(bars since last checkpoint), not O(run).
+    Every COMPACT_EVERY records the log is rewritten as a single full record
+    so loading does not have to replay an ever-growing list of deltas.
+
+    The bounded downsampled dashboard history is not part of the log; it is
+    kept in a sibling `.hist` file that is atomically replaced on each save.
+    """
+    def __init__(self, directory='checkpoints', compression_level=1):
+        self.directory = directory
+        self.compression_level = compression_level
+        self._pending = None # In-flight background write, if any
+        self._written = {} # name -> what the file already contains
+
+    def path_for(self, name):
+        if not VALID_NAME.match(name) or name.startswith('.'):
+            raise ValueError(f"Invalid checkpoint name: {name}")
+        return os.path.join(self.directory, f"{name}.ckpt")
+
+    def history_path_for(self, name):
+        return self.path_for(name)[:-len('.ckpt')] + '.hist'
+
+    @property
+    def busy(self):
+        return self._pending is not None and not self._pending.done()
+
+    def reset(self, name):
+        """Makes the next save to `name` start a new file with the full state."""
+        self._written.pop(name, None)
+
+    def capture(self, portfolio, strategy, strategy_name, timestamp, bar_index, history=None):
+        """
+        Captures the current state on the caller's thread.
+        Only small mutable containers are copied; the append-only equity curve,
+        trade history and strategy price history are referenced together with
+        their current lengths and sliced later in the worker thread.
+        """
+        portfolio_shell = copy.copy(portfolio)
+        portfolio_shell.positions = dict(portfolio.positions)
+        portfolio_shell.equity_curve = []
+        portfolio_shell.trade_history = []
+
+        strategy_shell = copy.copy(strategy)
+        for key, value in list(vars(strategy_shell).items()):
+            if isinstance(value, dict):
+                setattr(strategy_shell, key, dict(value))
+        strategy_history = getattr(strategy_shell, 'history', {})
+        strategy_shell.history = {}
+
+        return {
+            'state': {
+                'version': CHECKPOINT_VERSION,
+                'created_at': time.time(),
+                'strategy_name': strategy_name,
+                'timestamp': timestamp,
+                'bar_index': bar_index,
+                'portfolio': portfolio_shell,
+                'strategy': strategy_shell,
+            },
+            # Bounded and mutated in place, so take a cheap copy; it is pickled in the worker
+            'history': history.copy() if history is not None else None,
+            'equity_curve': (portfolio.equity_curve, len(portfolio.equity_curve)),
+            'trade_history': (portfolio.trade_history, len(portfolio.trade_history)),
+            'strategy_history': strategy_history, # ticker -> DataFrame, replaced (not mutated) on each bar
+        }
+
+    def _write(self, name, snapshot):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(name)
+        written = self._written.get(name)
+        if written is not None and not os.path.exists(path):
+            written = None
+        full = written is None or written['records'] >= COMPACT_EVERY
+        if full:
+            written = {'size': 0, 'records': 0, 'equity_curve': 0, 'trade_history': 0, 'strategy_history': {}}
+
+        equity_curve, equity_len = snapshot['equity_curve']
+        trade_history, trades_len = snapshot['trade_history']
+        history_rows = {}
+        history_delta = {}
+        for ticker, df in snapshot['strategy_history'].items():
+            done = written['strategy_history'].get(ticker, 0)
+            history_rows[ticker] = len(df)
+            if len(df) > done:
+                history_delta[ticker] = df.iloc[done:]
+
+        record = dict(
+            snapshot['state'],
+            equity_curve=equity_curve[written['equity_curve']:equity_len],
+            trade_history=trade_history[written['trade_history']:trades_len],
+            strategy_history=history_delta,
+        )
+        blob = zlib.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL), self.compression_level)
+        frame = RECORD_HEADER.pack(len(blob)) + blob
+
+        if full:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            # Atomic swap so a crash mid-write never leaves a truncated checkpoint
+            os.replace(tmp_path, path)
+            size = len(frame)
+        else:
+            with open(path, 'r+b') as f:
+                # Drop any partial record left behind by an interrupted append
+                f.seek(written['size'])
+                f.truncate()
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            size = written['size'] + len(frame)
+
+        history_tmp_path = self.history_path_for(name) + '.tmp'
+        with open(history_tmp_path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(snapshot['history'], protocol=pickle.HIGHEST_PROTOCOL), self.compression_level))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(history_tmp_path, self.history_path_for(name))
+
+        self._written[name] = {
+            'size': size,
+            'records': written['records'] + 1,
+            'equity_curve': equity_len,
+            'trade_history': trades_len,
+            'strategy_history': history_rows,
+        }
+        return path
+
+    async def save(self, name, snapshot):
+        """Serializes, compresses and writes a captured snapshot in a worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._write, name, snapshot)
+
+    def save_in_background(self, name, snapshot):
+        """
+        Schedules a write without awaiting it.
+        Skips the write if the previous one is still running, so a slow disk
+        never queues up work behind the simulation loop.
+        """
+        if self.busy:
+            return False
+        self._pending = asyncio.ensure_future(self.save(name, snapshot))
+        return True
+
+    async def flush(self):
+        """
+        Waits for any in-flight background write to finish.
+        The write is shielded so cancelling the caller never abandons it midway.
+        """
+        if self._pending is not None:
+            try:
+                await asyncio.shield(self._pending)
+            except Exception as e:
+                print(f"Background checkpoint failed: {e}")
+
+    def _read_records(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        records = []
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            (length,) = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + length
+            if end > len(data):
+                break # Partial trailing record from an interrupted write
+            records.append(_decode(data[offset + RECORD_HEADER.size:end]))
+            offset = end
+        return records, offset
+
+    def _read_history(self, name):
+        # The dashboard history is a convenience; a missing or corrupt file just starts a fresh one
+        try:
+            with open(self.history_path_for(name), 'rb') as f:
+                return _decode(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def load(self, name):
+        records, size = self._read_records(self.path_for(name))
+        if not records:
+            raise ValueError(f"Checkpoint is empty: {name}")
+        state = records[-1]
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {state.get('version')}")
+
+        portfolio = state['portfolio']
+        portfolio.equity_curve = [v for record in records for v in record['equity_curve']]
+        portfolio.trade_history = [t for record in records for t in record['trade_history']]
+
+        parts = {}
+        for record in records:
+            for ticker, df in record['strategy_history'].items():
+                parts.setdefault(ticker, []).append(df)
+        strategy = state['strategy']
+        strategy.history = {ticker: pd.concat(dfs) for ticker, dfs in parts.items()}
+
+        # Lets a resume under the same name append to this file (see `adopt`)
+        written = {
+            'size': size,
+            'records': len(records),
+            'equity_curve': len(portfolio.equity_curve),
+            'trade_history': len(portfolio.trade_history),
+            'strategy_history': {ticker: len(df) for ticker, df in strategy.history.items()},
+        }
+        return {
+            'strategy_name': state['strategy_name'],
+            'timestamp': state['timestamp'],
+            'bar_index': state['bar_index'],
+            'portfolio': portfolio,
+            'strategy': strategy,
+            'history': self._read_history(name),
+            'written': written,
+        }
+
+    async def load_async(self, name):
+        """Loads a checkpoint in a worker thread so the event loop keeps serving."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.load, name)
+
+    def adopt(self, name, state):
+        """Makes the next save to `name` append to the file `state` was loaded from."""
+        self._written[name] = state['written']
+
+    def list(self):
+        if not os.path.isdir(self.directory):
+            return []
+        checkpoints = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.ckpt'):
+                continue
+            path = os.path.join(self.directory, filename)
+            checkpoints.append({
+                'name': filename[:-len('.ckpt')],
+                'size_bytes': os.path.getsize(path),
+                'modified_at': os.path.getmtime(path),
+            })
+        return checkpoints
+
+def _decode(blob):
+    try:
+        return pickle.loads(zlib.decompress(blob))
+    except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, TypeError) as e:
+        raise ValueError(f"Corrupt checkpoint record: {e}")
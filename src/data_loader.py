@@ -52,10 +52,12 @@ class DataLoader:
         print(f"Loaded data for {len(self.data)} tickers.")
         return self.data
 
-    def get_latest_candles(self):
+    def get_latest_candles(self, start_after=None):
         """
         Generator that yields a dictionary of {ticker: candle} for each timestamp.
         Simulates the market moving forward in time.
+        If start_after is given, only timestamps after it are yielded (used to
+        resume from a checkpoint).
         """
         if not self.data:
             self.fetch_history()
@@ -63,6 +65,8 @@ class DataLoader:
         # Find the common index (timestamps)
         # We take the union of all indices to handle slightly misaligned data
         all_indices = sorted(set().union(*[df.index for df in self.data.values()]))
+        if start_after is not None:
+            all_indices = [ts for ts in all_indices if ts > start_after]
         
         for timestamp in all_indices:
             snapshot = {}
@@ -0,0 +1,153 @@
+import copy
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        points (list): (x, y, label) tuples sorted by x.
+        threshold (int): Maximum number of points to return.
+
+    Returns:
+        list: Subset of points that preserves the visual shape of the series.
+    """
+    n = len(points)
+    if threshold >= n or n < 3:
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]]
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0 # Index of the previously selected point
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        # Pick the point in the current bucket forming the largest triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a][0], points[a][1]
+        max_area = -1.0
+        max_index = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                max_index = j
+
+        sampled.append(points[max_index])
+        a = max_index
+
+    sampled.append(points[-1])
+    return sampled
+
+class DownsampledSeries:
+    """
+    Keeps a bounded, shape-preserving summary of an append-only series.
+    Points are grouped into fixed-width x buckets, each keeping only its lowest
+    and highest point. When there are more than `capacity` buckets the width
+    doubles and neighbouring buckets merge, so every part of the run keeps a
+    share of points proportional to the x range it covers. LTTB is applied to
+    this summary on request.
+    """
+    def __init__(self, capacity=2000):
+        self.capacity = capacity
+        self.bucket_width = 1
+        self.buckets = [] # [start_x, min_point, max_point], point = (x, y, label)
+        self.last = None # Most recent point, always kept so the series ends at "now"
+        self.count = 0 # Total points ever appended
+
+    def append(self, x, y, label=None):
+        point = (x, y, label)
+        self.last = point
+        self.count += 1
+        start = x - x % self.bucket_width
+        if self.buckets and self.buckets[-1][0] == start:
+            bucket = self.buckets[-1]
+            if y < bucket[1][1]:
+                bucket[1] = point
+            if y > bucket[2][1]:
+                bucket[2] = point
+        else:
+            self.buckets.append([start, point, point])
+            if len(self.buckets) > self.capacity:
+                self._widen()
+
+    def _widen(self):
+        self.bucket_width *= 2
+        merged = []
+        for start, low, high in self.buckets:
+            start = start - start % self.bucket_width
+            if merged and merged[-1][0] == start:
+                bucket = merged[-1]
+                if low[1] < bucket[1][1]:
+                    bucket[1] = low
+                if high[1] > bucket[2][1]:
+                    bucket[2] = high
+            else:
+                merged.append([start, low, high])
+        self.buckets = merged
+
+    def points(self):
+        points = []
+        for _, low, high in self.buckets:
+            points.extend(sorted({low, high}, key=lambda p: p[0]))
+        if self.last is not None and (not points or points[-1] != self.last):
+            points.append(self.last)
+        return points
+
+    def downsample(self, max_points):
+        return lttb(self.points(), max_points)
+
+    def copy(self):
+        """
+        Cheap snapshot: only the open (last) bucket is ever mutated in place,
+        and widening builds new bucket lists, so the others can be shared.
+        """
+        clone = copy.copy(self)
+        clone.buckets = self.buckets[:-1] + [list(b) for b in self.buckets[-1:]]
+        return clone
+
+class SimulationHistory:
+    """
+    Incrementally maintained equity and price history for late-joining clients.
+    """
+    def __init__(self, capacity=2000):
+        self.capacity = capacity
+        self.equity = DownsampledSeries(capacity)
+        self.prices = {} # ticker -> DownsampledSeries
+
+    def record(self, bar_index, timestamp, equity, prices):
+        label = str(timestamp)
+        self.equity.append(bar_index, equity, label)
+        for ticker, price in prices.items():
+            if ticker not in self.prices:
+                self.prices[ticker] = DownsampledSeries(self.capacity)
+            self.prices[ticker].append(bar_index, price, label)
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone.equity = self.equity.copy()
+        clone.prices = {ticker: series.copy() for ticker, series in self.prices.items()}
+        return clone
+
+    def to_dict(self, max_points=500, tickers=None):
+        if tickers is None:
+            tickers = list(self.prices.keys())
+        return {
+            'bars': self.equity.count,
+            'equity': _serialize(self.equity.downsample(max_points)),
+            'prices': {
+                ticker: _serialize(self.prices[ticker].downsample(max_points))
+                for ticker in tickers if ticker in self.prices
+            }
+        }
+
+def _serialize(points):
+    return [{'bar': x, 'timestamp': label, 'value': y} for x, y, label in points]
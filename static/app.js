@@ -69,6 +69,8 @@ ws.onmessage = (event) => {
 
     if (data.type === 'update') {
         updateDashboard(data);
+    } else if (data.type === 'history') {
+        restoreHistory(data);
     } else if (data.type === 'finished') {
         console.log("Simulation Finished");
     }
@@ -101,6 +103,32 @@ function updateDashboard(data) {
     }
 }
 
+// Initial frame for clients joining mid-run: downsampled history + recent trades
+function restoreHistory(data) {
+    initialCash = data.initial_cash;
+    els.tradeLog.innerHTML = '';
+    renderTrades(data.trades);
+
+    if (data.equity.length > 0) {
+        const latest = data.equity[data.equity.length - 1];
+        const prices = {};
+        Object.entries(data.prices).forEach(([ticker, series]) => {
+            if (series.length > 0) {
+                prices[ticker] = series[series.length - 1].value;
+            }
+        });
+        updateDashboard({
+            timestamp: latest.timestamp,
+            equity: latest.value,
+            prices: prices,
+            positions: data.positions,
+            trades: []
+        });
+    } else {
+        renderPositions(data.positions, {});
+    }
+}
+
 function renderMarketList(prices) {
     els.marketList.innerHTML = '';
     Object.entries(prices).forEach(([ticker, price]) => {